@@ -1,4 +1,3 @@
-import json
 import pickle
 
 import click
@@ -16,7 +15,7 @@ from . import schema
     help="Root URL of the Factorio Lua API documentation. You may want to use something like file:///path/to/factorio/doc-html/ to avoid downloading it, or something like https://lua-api.factorio.com/2.0.28/ or https://lua-api.factorio.com/latest/ to extract from a specific version.",
     show_default=True,
 )
-@click.argument("output", type=click.File("w"), default="-")
+@click.argument("output", type=click.File("wb"), default="-")
 @click.option(
     "--do-patch/--skip-patch",
     default=True,
@@ -47,6 +46,12 @@ from . import schema
     multiple=True,
     help="Forbid the specified type from appearing in the schema. Can be specified multiple times.",
 )
+@click.option(
+    "--indent-definitions/--one-definition-per-line",
+    default=True,
+    help="Indent each definition over several lines, or write each definition compactly on its own line (to let consumers process definitions one line at a time).",
+    show_default=True,
+)
 @click.option(
     "--workers", type=int, default=-1, help="Number of worker threads to use. Default is the number of CPU cores."
 )
@@ -60,6 +65,7 @@ def main(
     limit_to: list[str],
     include_descendants: bool,
     forbid: list[str],
+    indent_definitions: bool,
     workers: int,
     pickle_doc_to: click.utils.LazyFile | None,
     unpickle_doc_from: click.utils.LazyFile | None,
@@ -75,15 +81,16 @@ def main(
     if do_patch:
         patching.patch_doc(doc, strict_numbers=strict_numbers)
 
-    json_schema = schema.make_json_schema(
+    json_schema_chunks = schema.make_json_schema(
         doc,
         strict_numbers=strict_numbers,
         limit_to_prototype_names=limit_to or None,
         include_descendants=include_descendants,
         forbid_type_names=forbid,
+        one_definition_per_line=not indent_definitions,
     )
 
-    json.dump(json_schema, output, indent=2)
+    output.writelines(json_schema_chunks)
 
 
 if __name__ == "__main__":
@@ -1,41 +1,63 @@
 from typing import Any, cast
+import functools
+import pathlib
+import urllib.parse
+import urllib.request
 
-from bs4 import BeautifulSoup
+import lxml.etree
+import lxml.html
 import requests
 import requests_cache
-import requests_file  # type: ignore
 
 
 # Work around non-pickeability of `requests_cache.CachedSession`
-# Not great because we actually need only one instance per worker process and are creating one per task, i.e. one per download.
+# The actual session is created once per worker process and shared by all the tasks (i.e. downloads) it runs.
 class _CachedSession:
     def __init__(self) -> None:
-        self.session = requests_cache.CachedSession()
+        self.session = _get_process_cached_session()
 
     def __getstate__(self) -> dict[str, Any]:
         return {}
 
     def __setstate__(self, state: dict[str, Any]) -> None:
-        self.session = requests_cache.CachedSession()
+        self.session = _get_process_cached_session()
 
     def get(self, *args: Any, **kwargs: Any) -> requests.Response:
         return self.session.get(*args, **kwargs)
 
 
+@functools.cache
+def _get_process_cached_session() -> requests_cache.CachedSession:
+    return requests_cache.CachedSession()
+
+
+_html_parser = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+
+
 class Crawler:
     def __init__(self, root_url: str) -> None:
         if not root_url.endswith("/"):
             root_url += "/"
         self.root_url = root_url
         if root_url.startswith("file://"):
-            self.session = requests.Session()
-            self.session.mount("file://", requests_file.FileAdapter())
+            # Local documentation is read directly, without the overhead of a 'requests' round-trip for each page
+            split_url = urllib.parse.urlsplit(root_url)
+            if split_url.netloc not in ("", "localhost"):
+                raise ValueError(f"Unsupported host in file URL {root_url!r}")
+            self.root_path: pathlib.Path | None = pathlib.Path(urllib.request.url2pathname(split_url.path))
         else:
+            self.root_path = None
             self.session = cast(requests.Session, _CachedSession())
 
-    def get(self, *path: str) -> BeautifulSoup:
-        url = self.root_url + "/".join(path) + ".html"
-        response = self.session.get(url)
-        response.raise_for_status()
-        response.encoding = "utf-8"
-        return BeautifulSoup(response.text, "lxml")
+    def get_html(self, *path: str) -> bytes:
+        if self.root_path is None:
+            url = self.root_url + "/".join(path) + ".html"
+            response = self.session.get(url)
+            response.raise_for_status()
+            return response.content
+        else:
+            return self.root_path.joinpath(*path[:-1], path[-1] + ".html").read_bytes()
+
+    def get(self, *path: str) -> lxml.etree._Element:
+        # Let lxml decode the raw bytes instead of decoding them in Python first
+        return lxml.html.document_fromstring(self.get_html(*path), parser=_html_parser)
@@ -11,9 +11,12 @@ T = typing.TypeVar("T")
 E = typing.TypeVar("E")
 
 
-class TypeExpression(abc.ABC):
-    @abc.abstractmethod
-    def accept(self, visitor: TypeExpressionVisitor[E]) -> E: ...
+# Not an 'abc.ABC': 'isinstance' checks on type expressions are frequent, and non-matching ones are several times
+# slower under 'ABCMeta'. The cost is that a subclass missing 'accept' is no longer refused at instantiation: it only
+# fails with 'NotImplementedError' when 'accept' is called.
+class TypeExpression:
+    def accept(self, visitor: TypeExpressionVisitor[E]) -> E:
+        raise NotImplementedError
 
 
 @dataclasses.dataclass
@@ -81,7 +84,7 @@ class DictionaryTypeExpression(TypeExpression):
         return visitor.visit_dictionary(self.keys.accept(visitor), self.values.accept(visitor))
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Property:
     names: list[str]
     type: TypeExpression
@@ -138,7 +141,7 @@ class TupleTypeExpression(TypeExpression):
         return visitor.visit_tuple([member.accept(visitor) for member in self.members])
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class VisitedProperty[E]:
     names: list[str]
     type: E
@@ -183,13 +186,13 @@ class TypeExpressionVisitor[E](abc.ABC):
     def visit_tuple(self, members: list[E]) -> E: ...
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Type:
     name: str
     definition: TypeExpression
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Prototype:
     name: str
     key: str | None
@@ -237,20 +240,28 @@ class Doc:
     types: list[Type]
     prototypes: list[Prototype]
 
+    # Patching looks types and prototypes up by name many times: index them once instead of scanning the lists each time
+    types_by_name: dict[str, Type] = dataclasses.field(init=False, repr=False, compare=False)
+    prototypes_by_name: dict[str, Prototype] = dataclasses.field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self.types_by_name = {type.name: type for type in self.types}
+        self.prototypes_by_name = {prototype.name: prototype for prototype in self.prototypes}
+
     @typing.overload
     def get_type_def(self, name: str) -> TypeExpression: ...
     @typing.overload
     def get_type_def(self, name: str, t: type[T]) -> T: ...
     def get_type_def(self, name: str, t: type[T] | None = None) -> TypeExpression | T:
-        for type in self.types:
-            if type.name == name:
-                if t is not None:
-                    assert isinstance(type.definition, t), type
-                return type.definition
-        raise ValueError(f"Type {name!r} not found")
+        type = self.types_by_name.get(name)
+        if type is None:
+            raise ValueError(f"Type {name!r} not found")
+        if t is not None:
+            assert isinstance(type.definition, t), type
+        return type.definition
 
     def get_prototype(self, name: str) -> Prototype:
-        for prototype in self.prototypes:
-            if prototype.name == name:
-                return prototype
-        raise ValueError(f"Prototype {name!r} not found")
+        prototype = self.prototypes_by_name.get(name)
+        if prototype is None:
+            raise ValueError(f"Prototype {name!r} not found")
+        return prototype
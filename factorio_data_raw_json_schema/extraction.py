@@ -1,9 +1,10 @@
 from typing import Iterable
 import re
+import typing
 
-import bs4
 import joblib
 import lark
+import lxml.etree
 import tqdm
 
 from . import documentation
@@ -11,6 +12,9 @@ from . import patching
 from .crawling import Crawler
 
 
+ignored_type_names = frozenset({"Data", "DataExtendMethod", "AnyPrototype"})
+
+
 def extract(*, crawler: Crawler, workers: int) -> documentation.Doc:
     extractor = _Extractor(crawler=crawler, workers=workers)
 
@@ -38,23 +42,26 @@ class _Extractor:
         self.types: list[documentation.Type] = []
         self.prototypes: list[documentation.Prototype] = []
 
+    def __getstate__(self) -> dict[str, object]:
+        # Each parallel task ships a bound method of this object to a worker process: don't ship the results
+        # accumulated so far (all types while extracting prototypes), which workers don't need
+        return self.__dict__ | {"all_prototype_names": set(), "types": [], "prototypes": []}
+
     def extract_all_type_names(self) -> None:
         def gen() -> Iterable[str]:
-            for a in self.crawler.get("types").find_all("a"):
-                link = tag(a).get("href")
-                if link is not None and str(link).startswith("types/"):
-                    type = str(link).split("#")[0].split("/")[-1]
+            for link in extract_links(self.crawler.get("types")):
+                if link.startswith("types/"):
+                    type = link.partition("#")[0].rpartition("/")[2]
                     assert type.endswith(".html")
                     yield type[:-5]
 
-        self.all_type_names = set(gen()) - {"Data", "DataExtendMethod", "AnyPrototype"}
+        self.all_type_names = {type_name for type_name in gen() if type_name not in ignored_type_names}
 
     def extract_all_prototype_names(self) -> None:
         def gen() -> Iterable[str]:
-            for a in self.crawler.get("prototypes").find_all("a"):
-                link = tag(a).get("href")
-                if link is not None and str(link).startswith("prototypes/"):
-                    prototype = str(link).split("#")[0].split("/")[-1]
+            for link in extract_links(self.crawler.get("prototypes")):
+                if link.startswith("prototypes/"):
+                    prototype = link.partition("#")[0].rpartition("/")[2]
                     assert prototype.endswith(".html")
                     yield prototype[:-5]
 
@@ -76,37 +83,41 @@ class _Extractor:
             yield None
 
     def _extract_type(self, type_name: str) -> documentation.Type:
-        soup = self.crawler.get("types", type_name)
+        page = self.crawler.get("types", type_name)
 
-        h2_text = tag(soup.find("h2")).text
-        if (m := re.match(r"^" + type_name + r"\s*::\s*(.*?)\s*(Example code)?$", h2_text)) is not None:
+        h2_text = text(tag(page.find(".//h2")))
+        if (m := type_header_regex.match(h2_text)) is not None and m.group(1) == type_name:
+            type_expression = m.group(2).replace(" - abstract", "")
+
+            # Only the type names that appear in the expression can be looked up, so there is no need to
+            # build an entry for each of the (many) other type names, for each type.
             local_types: dict[str, documentation.TypeExpression] = {
                 name: documentation.UnionTypeExpression(members=[documentation.RefTypeExpression(ref=name)])
-                for name in self.all_type_names
+                for name in word_regex.findall(type_expression)
+                if name in self.all_type_names
             }
 
-            type_expression = m.group(1).replace(" - abstract", "")
             if "struct" in type_expression:
-                properties_div_soup = soup.find("div", id="attributes-body-main")
+                properties_div_element = find_first(div_by_id_xpath, page, id="attributes-body-main")
 
-                overridden_properties_soup = soup.find("div", id="attributes-body-overridden")
-                if overridden_properties_soup is None:
+                overridden_properties_element = find_first(div_by_id_xpath, page, id="attributes-body-overridden")
+                if overridden_properties_element is None:
                     overridden_properties = []
                 else:
                     overridden_properties = list(
-                        extract_struct_properties(type_name, overridden_properties_soup, self.all_type_names)
+                        extract_struct_properties(type_name, overridden_properties_element, self.all_type_names)
                     )
 
                 local_types["struct"] = documentation.StructTypeExpression(
-                    base=extract_struct_base(soup),
-                    properties=list(extract_struct_properties(type_name, properties_div_soup, self.all_type_names)),
+                    base=extract_struct_base(page),
+                    properties=list(extract_struct_properties(type_name, properties_div_element, self.all_type_names)),
                     overridden_properties=overridden_properties,
                     custom_properties=None,
                 )
 
             if "union" in type_expression:
                 local_types["union"] = documentation.UnionTypeExpression(
-                    members=list(extract_union_members(soup, self.all_type_names))
+                    members=list(extract_union_members(page, self.all_type_names))
                 )
 
             try:
@@ -117,38 +128,40 @@ class _Extractor:
                 )
             except lark.exceptions.LarkError:
                 assert False, f"failed to parse type expression: {type_expression!r}"
-        elif (m := re.match(r"^" + type_name + r"\s* builtin\s*(Example code)?$", h2_text)) is not None:
+        elif (m := builtin_type_header_regex.match(h2_text)) is not None and m.group(1) == type_name:
             return documentation.Type(name=type_name, definition=documentation.BuiltinTypeExpression(name=type_name))
         else:
             assert False, f"failed to regex-match type header: {h2_text!r}"
 
     def _extract_prototype(self, prototype_name: str) -> documentation.Prototype:
-        soup = self.crawler.get("prototypes", prototype_name)
+        page = self.crawler.get("prototypes", prototype_name)
         properties = list(
-            extract_struct_properties(prototype_name, soup.find("div", id="attributes-body-main"), self.all_type_names)
+            extract_struct_properties(
+                prototype_name, find_first(div_by_id_xpath, page, id="attributes-body-main"), self.all_type_names
+            )
         )
 
-        overridden_properties_soup = soup.find("div", id="attributes-body-overridden")
-        if overridden_properties_soup is None:
+        overridden_properties_element = find_first(div_by_id_xpath, page, id="attributes-body-overridden")
+        if overridden_properties_element is None:
             overridden_properties = []
         else:
             overridden_properties = list(
-                extract_struct_properties(prototype_name, overridden_properties_soup, self.all_type_names)
+                extract_struct_properties(prototype_name, overridden_properties_element, self.all_type_names)
             )
 
-        custom_properties_div_soup = soup.find("div", id="custom_properties")
-        if custom_properties_div_soup is None:
+        custom_properties_div_element = find_first(div_by_id_xpath, page, id="custom_properties")
+        if custom_properties_div_element is None:
             custom_properties: documentation.TypeExpression | None = None
         else:
-            custom_properties_text = tag(tag(tag(custom_properties_div_soup).parent).find("h3")).text
+            custom_properties_text = text(tag(tag(custom_properties_div_element.getparent()).find(".//h3")))
             assert custom_properties_text.startswith("Custom properties  \xa0::\xa0string → ")
             custom_properties_type_name = custom_properties_text[32:]
             custom_properties = documentation.RefTypeExpression(ref=custom_properties_type_name)
 
         return documentation.Prototype(
             name=prototype_name,
-            key=extract_prototype_key(soup),
-            base=extract_struct_base(soup),
+            key=extract_prototype_key(page),
+            base=extract_struct_base(page),
             properties=properties,
             overridden_properties=overridden_properties,
             custom_properties=custom_properties,
@@ -158,22 +171,63 @@ class _Extractor:
         return documentation.Doc(types=self.types, prototypes=self.prototypes)
 
 
+type_header_regex = re.compile(r"^(.*?)\s*::\s*(.*?)\s*(Example code)?$")
+
+
+builtin_type_header_regex = re.compile(r"^(.*?)\s* builtin\s*(Example code)?$")
+
+
+local_type_header_regex = re.compile(r"^(.*?)\s*::\s*(.*?)\s*$")
+
+
+property_header_regex = re.compile(r"^(.*?)\s*::\s*(.*?)\s*(optional)?\s*(new|changed)?$")
+
+
+word_regex = re.compile(r"\w+")
+
+
+# XPath expressions are compiled once, and evaluated by libxml2 instead of walking the tree in Python
+div_by_id_xpath = lxml.etree.XPath("//div[@id = $id]")
+
+inherits_from_xpath = lxml.etree.XPath('//*[text()[contains(., "Inherits from")]]')
+
+union_member_names_xpath = lxml.etree.XPath(
+    './/span[contains(concat(" ", normalize-space(@class), " "), " docs-attribute-name ")]'
+)
+
+inline_type_divs_xpath = lxml.etree.XPath(
+    './/div[contains(concat(" ", normalize-space(@class), " "), " inline-type ")]'
+)
+
+properties_h2_xpath = lxml.etree.XPath('.//h2[. = "Properties"]')
+
+union_members_h4_xpath = lxml.etree.XPath('.//h4[. = "Union members"]')
+
+string_xpath = lxml.etree.XPath("string()", smart_strings=False)
+
+links_xpath = lxml.etree.XPath("//a/@href", smart_strings=False)
+
+
+def extract_links(page: lxml.etree._Element) -> list[str]:
+    return typing.cast(list[str], links_xpath(page))
+
+
 def extract_union_members(
-    soup: bs4.element.PageElement | None, global_types: set[str]
+    element: lxml.etree._Element | None, global_types: set[str]
 ) -> Iterable[documentation.TypeExpression]:
-    if soup is not None:
+    if element is not None:
         transformer = TypeExpressionTransformer(global_types, patching.local_types_for_union)
 
-        for span_soup in (tag(el) for el in tag(soup).find_all("span", class_="docs-attribute-name")):
-            yield transformer.transform(type_expression_parser.parse(str(span_soup.text).strip()))
+        for span_element in find_all(union_member_names_xpath, element):
+            yield transformer.transform(type_expression_parser.parse(text(span_element).strip()))
 
 
-def extract_prototype_key(soup: bs4.BeautifulSoup) -> str | None:
-    text = str(tag(soup.find("h2")).text)
-    if "abstract" in text:
+def extract_prototype_key(page: lxml.etree._Element) -> str | None:
+    h2_text = text(tag(page.find(".//h2")))
+    if "abstract" in h2_text:
         return None
     else:
-        parts = text.split(" ")
+        parts = h2_text.split(" ")
         assert len(parts) >= 2, parts
         key = parts[1]
         if key == "":  # Space Age icon
@@ -182,37 +236,35 @@ def extract_prototype_key(soup: bs4.BeautifulSoup) -> str | None:
         return key[1:-1]
 
 
-def extract_struct_base(soup: bs4.BeautifulSoup) -> str | None:
-    base_soup = soup.find(string=re.compile(r"Inherits from"))
-    if base_soup is not None:
-        base_link_soup = tag(base_soup.parent).find("a")
-        assert base_link_soup is not None
-        base = base_link_soup.text
-        assert isinstance(base, str)
-        return base
+def extract_struct_base(page: lxml.etree._Element) -> str | None:
+    base_parent_element = find_first(inherits_from_xpath, page)
+    if base_parent_element is not None:
+        return text(tag(base_parent_element.find(".//a")))
 
     return None
 
 
 def extract_struct_properties(
-    type_name: str, properties_div_soup: bs4.element.PageElement | None, global_types: set[str]
+    type_name: str, properties_div_element: lxml.etree._Element | None, global_types: set[str]
 ) -> Iterable[documentation.Property]:
-    if properties_div_soup is not None:
-        for property_div_soup in (tag(el) for el in tag(properties_div_soup).find_all("div", recursive=False)):
-            property_header_soup = tag(property_div_soup.find("h3", recursive=False))
-            property_names = str(tag(property_header_soup.contents[0]).contents[0]).strip().split(" or ")
+    if properties_div_element is not None:
+        for property_div_element in properties_div_element.iterchildren("div"):
+            property_header_element = tag(property_div_element.find("h3"))
+            property_header_text = text(property_header_element)
+            assert not property_header_element.text, f"unexpected property header: {property_header_text!r}"
+            property_names = str(tag(property_header_element.find("*")).text).strip().split(" or ")
 
             local_types: dict[str, documentation.TypeExpression] = {}
-            for local_type_div_soup in (tag(el) for el in property_div_soup.find_all("div", class_="inline-type")):
-                local_type_header_text = tag(local_type_div_soup.find("h4")).text
-                if (m := re.match(r"^(.*?)\s*::\s*(.*?)\s*$", local_type_header_text)) is not None:
+            for local_type_div_element in find_all(inline_type_divs_xpath, property_div_element):
+                local_type_header_text = text(tag(local_type_div_element.find(".//h4")))
+                if (m := local_type_header_regex.match(local_type_header_text)) is not None:
                     local_type_name = m.group(1)
                     match m.group(2):
                         case "struct":
                             local_type_properties = list(
                                 extract_struct_properties(
                                     f"{type_name}.{local_type_name}",
-                                    tag(local_type_div_soup.find("h2", string="Properties")).next_sibling,
+                                    tag(find_first(properties_h2_xpath, local_type_div_element)).getnext(),
                                     global_types,
                                 )
                             )
@@ -226,7 +278,7 @@ def extract_struct_properties(
                             local_types[local_type_name] = documentation.UnionTypeExpression(
                                 members=list(
                                     extract_union_members(
-                                        tag(local_type_div_soup.find("h4", string="Union members")).next_sibling,
+                                        tag(find_first(union_members_h4_xpath, local_type_div_element)).getnext(),
                                         global_types,
                                     )
                                 )
@@ -242,20 +294,17 @@ def extract_struct_properties(
                 else:
                     assert False, f"failed to regex-match local type header: {local_type_header_text!r}"
 
-            property_header_text = property_header_soup.text
-            m = re.match(
-                r"^" + " or ".join(property_names) + r"\s*::\s*(.*?)\s*(optional)?\s*(new|changed)?$",
-                property_header_text,
-            )
+            m = property_header_regex.match(property_header_text)
             assert m is not None, f"failed to regex-match property header: {property_header_text!r}"
-            optional = m.group(2) == "optional"
+            assert m.group(1) == " or ".join(property_names), f"unexpected property header: {property_header_text!r}"
+            optional = m.group(3) == "optional"
 
-            match m.group(1):
+            match m.group(2):
                 case "union":
                     property_type: documentation.TypeExpression = documentation.UnionTypeExpression(
                         members=list(
                             extract_union_members(
-                                tag(property_div_soup.find("h4", string="Union members")).next_sibling, global_types
+                                tag(find_first(union_members_h4_xpath, property_div_element)).getnext(), global_types
                             )
                         )
                     )
@@ -359,11 +408,24 @@ class TypeExpressionTransformer(lark.Transformer[lark.Token, documentation.TypeE
         return documentation.BuiltinTypeExpression(name="uint8")
 
 
-def tag(tag: bs4.element.PageElement | None) -> bs4.element.Tag:
+def find_all(xpath: lxml.etree.XPath, element: lxml.etree._Element, **variables: str) -> list[lxml.etree._Element]:
+    return typing.cast(list[lxml.etree._Element], xpath(element, **variables))
+
+
+def find_first(xpath: lxml.etree.XPath, element: lxml.etree._Element, **variables: str) -> lxml.etree._Element | None:
+    elements = find_all(xpath, element, **variables)
+    return elements[0] if elements else None
+
+
+def text(element: lxml.etree._Element) -> str:
+    # All the text in the element and its descendants, like BeautifulSoup's 'Tag.text'
+    return typing.cast(str, string_xpath(element))
+
+
+def tag(element: lxml.etree._Element | None) -> lxml.etree._Element:
     """
-    Assert at runtime that a PageElement is actually a Tag.
-    (Tag is a subclass of PageElement.)
+    Assert at runtime that an element was actually found.
     Helps with static type checking.
     """
-    assert isinstance(tag, bs4.element.Tag), f"{tag!r} is not a Tag"
-    return tag
+    assert element is not None, "element not found"
+    return element
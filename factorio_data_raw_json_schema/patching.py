@@ -14,7 +14,11 @@ from .schema import JsonDict
 # For example:
 #   cat game-definitions/space-age/script-output/data-raw-dump.json | jq '."assembling-machine"."captive-biter-spawner".allowed_effects'
 def array_to_json_definition(content: JsonDict) -> JsonDict:
-    return {"oneOf": [{"type": "array", "items": content}, {"type": "object", "additionalProperties": False}]}
+    return {"oneOf": [{"type": "array", "items": content}, empty_object_json_definition]}
+
+
+# Shared by all arrays
+empty_object_json_definition: JsonDict = {"type": "object", "additionalProperties": False}
 
 
 # Confusion around TriggerEffect
@@ -2,11 +2,13 @@ from __future__ import annotations
 
 from typing import Iterable
 import enum
+import functools
 import itertools
 import sys
 import typing
 
 import networkx as nx
+import orjson
 
 from . import documentation
 from . import patching
@@ -16,6 +18,10 @@ JsonValue = None | bool | int | float | str | typing.Collection["JsonValue"] | t
 JsonDict = dict[str, JsonValue]
 
 
+types_url_prefix = "https://lua-api.factorio.com/stable/types/"
+prototypes_url_prefix = "https://lua-api.factorio.com/stable/prototypes/"
+
+
 def make_json_schema(
     doc: documentation.Doc,
     *,
@@ -23,14 +29,15 @@ def make_json_schema(
     limit_to_prototype_names: Iterable[str] | None,
     include_descendants: bool,
     forbid_type_names: Iterable[str],
-) -> JsonValue:
+    one_definition_per_line: bool,
+) -> Iterable[bytes]:
     return JsonSchemaMaker(
         doc=doc,
         strict_numbers=strict_numbers,
         limit_to_prototype_names=limit_to_prototype_names,
         include_descendants=include_descendants,
         forbid_type_names=forbid_type_names,
-    ).json_schema
+    ).make_json_schema(one_definition_per_line=one_definition_per_line)
 
 
 class Forbidden(enum.Enum):
@@ -74,7 +81,10 @@ class JsonSchemaMaker:
         type_names_to_include = set(self.make_type_names_to_include())
         self.types_to_include = [type for type in self.doc.types if type.name in type_names_to_include]
 
-        self.json_schema = self.make_json_schema()
+        # Forbidden type names are final at this point, so a single maker can be shared (with its cache) by all definitions
+        self.json_definition_maker = JsonDefinitionMaker(
+            self.forbidden_type_names, self.all_type_definitions_by_name, self.strict_numbers
+        )
 
     def extend_forbidden_type_names(self) -> None:
         # A type is forbidden if either:
@@ -159,8 +169,26 @@ class JsonSchemaMaker:
     def gather_types_needed_by(self, t: documentation.TypeExpression) -> Iterable[str]:
         return set(t.accept(NeededTypesGatherer(self.forbidden_type_names, self.all_type_definitions_by_name)))
 
-    def make_json_schema(self) -> JsonDict:
-        properties = {
+    def make_json_schema(self, *, one_definition_per_line: bool) -> Iterable[bytes]:
+        # The schema is several megabytes, so we serialize it as a stream of chunks of UTF-8 JSON, one per definition,
+        # instead of serializing the whole JSON value at once.
+        # The result is formatted like 'json.dump(..., indent=2, ensure_ascii=False)' of that whole JSON value,
+        # except with 'one_definition_per_line', where each definition is compact, on its own line, so that consumers
+        # can scan the definitions line by line instead of parsing the whole schema.
+        header: JsonDict = {
+            "$schema": "https://json-schema.org/draft/2019-09/schema",
+            "title": "Factorio Data.raw",
+            "type": "object",
+            "properties": self.make_json_properties(),
+        }
+        # The definitions themselves are all built before returning (they share most of their sub-values, so this is
+        # cheap): an error while building them is raised before the output file is even opened, instead of leaving
+        # a truncated file.
+        definitions = list(self.make_json_definitions())
+        return dump_json_schema(header, definitions, one_definition_per_line=one_definition_per_line)
+
+    def make_json_properties(self) -> JsonValue:
+        return {
             prototype.key: typing.cast(
                 JsonDict,
                 self.make_json_definition(
@@ -175,28 +203,59 @@ class JsonSchemaMaker:
             for prototype in self.prototypes_to_include
         }
 
-        definitions = {
-            type.name: {"description": f"https://lua-api.factorio.com/stable/types/{type.name}.html"}
-            | typing.cast(JsonDict, self.make_json_definition(type.definition))
-            for type in self.types_to_include
-        } | {
-            prototype.name: {"description": f"https://lua-api.factorio.com/stable/prototypes/{prototype.name}.html"}
-            | typing.cast(JsonDict, self.make_json_definition(prototype.make_definition()))
-            for prototype in self.prototypes_to_include
-        }
-
-        return {
-            "$schema": "https://json-schema.org/draft/2019-09/schema",
-            "title": "Factorio Data.raw",
-            "type": "object",
-            "properties": properties,
-            "definitions": definitions,
-        }
+    def make_json_definitions(self) -> Iterable[tuple[str, JsonDict]]:
+        for name, description, definition in itertools.chain(
+            ((type.name, types_url_prefix + type.name + ".html", type.definition) for type in self.types_to_include),
+            (
+                (prototype.name, prototypes_url_prefix + prototype.name + ".html", prototype.make_definition())
+                for prototype in self.prototypes_to_include
+            ),
+        ):
+            yield name, {"description": description, **typing.cast(JsonDict, self.make_json_definition(definition))}
 
     def make_json_definition(self, t: documentation.TypeExpression) -> JsonDictOrForbidden:
-        return t.accept(
-            JsonDefinitionMaker(self.forbidden_type_names, self.all_type_definitions_by_name, self.strict_numbers)
-        )
+        return t.accept(self.json_definition_maker)
+
+
+def dump_json_schema(
+    header: JsonDict, definitions: list[tuple[str, JsonDict]], *, one_definition_per_line: bool
+) -> Iterable[bytes]:
+    yield orjson.dumps(header, option=orjson.OPT_INDENT_2)[:-2]  # Without the closing "\n}"
+    yield b',\n  "definitions": '
+    yield from dump_json_object_items(definitions, indent_level=1, indent_values=not one_definition_per_line)
+    yield b"\n}"
+
+
+def dump_json_object_items(
+    items: Iterable[tuple[str, JsonValue]], *, indent_level: int, indent_values: bool
+) -> Iterable[bytes]:
+    # Like 'orjson.dumps(dict(items), option=orjson.OPT_INDENT_2)' for an object nested 'indent_level' levels deep,
+    # but one item at a time (and, without 'indent_values', with each value compact on the same line as its key)
+    item_indent = b"\n" + b"  " * (indent_level + 1)
+    separator = b"{"
+    for key, value in items:
+        if indent_values:
+            json_value = orjson.dumps(value, option=orjson.OPT_INDENT_2).replace(b"\n", item_indent)
+        else:
+            json_value = orjson.dumps(value)
+        yield separator + item_indent + orjson.dumps(key) + b": " + json_value
+        separator = b","
+    if separator == b"{":
+        yield b"{}"
+    else:
+        yield b"\n" + b"  " * indent_level + b"}"
+
+
+@functools.cache
+def make_json_ref(name: str) -> JsonDict:
+    # Shared by all references to the same definition, like the builtins in 'JsonDefinitionMaker': must not be mutated
+    return {"$ref": f"#/definitions/{name}"}
+
+
+@functools.cache
+def make_json_const(type: str, value: bool | int | str) -> JsonDict:
+    # Same as 'make_json_ref': literal types like '"item"' are repeated across many definitions
+    return {"type": type, "const": value}
 
 
 E = typing.TypeVar("E")
@@ -275,24 +334,32 @@ class JsonDefinitionMaker(BaseTypeExpressionVisitor[JsonDictOrForbidden]):
     ) -> None:
         super().__init__(forbidden_type_names, all_type_definitions_by_name)
         self.builtins = self.strict_builtins if strict_numbers else self.lenient_builtins
+        self.base_definitions_by_name: dict[str | None, JsonDictOrForbidden | None] = {}
+
+    def maybe_visit_base(self, base_name: str | None) -> JsonDictOrForbidden | None:
+        # Prototypes have deep inheritance chains: visit each base once, not once per descendant.
+        # 'visit_struct' copies what it changes, so the cached definitions are not mutated.
+        if base_name not in self.base_definitions_by_name:
+            self.base_definitions_by_name[base_name] = super().maybe_visit_base(base_name)
+        return self.base_definitions_by_name[base_name]
 
     def visit_builtin(self, name: str) -> JsonDict:
         return self.builtins[name]
 
     def visit_literal_bool(self, value: bool) -> JsonDict:
-        return {"type": "boolean", "const": value}
+        return make_json_const("boolean", value)
 
     def visit_literal_string(self, value: str) -> JsonDict:
-        return {"type": "string", "const": value}
+        return make_json_const("string", value)
 
     def visit_literal_integer(self, value: int) -> JsonDict:
-        return {"type": "integer", "const": value}
+        return make_json_const("integer", value)
 
     def visit_ref(self, ref: str) -> JsonDictOrForbidden:
         if self.get_type_definition(ref) is forbidden:
             return forbidden
         else:
-            return {"$ref": f"#/definitions/{ref}"}
+            return make_json_ref(ref)
 
     def visit_union(self, members: list[JsonDictOrForbidden]) -> JsonDictOrForbidden:
         anyOf: list[JsonValue] = []
@@ -324,10 +391,10 @@ class JsonDefinitionMaker(BaseTypeExpressionVisitor[JsonDictOrForbidden]):
         if base_definition is forbidden:
             return forbidden
 
-        json_properties = typing.cast(JsonDict, base_definition.get("properties", {}))
-        required_by_name = {k: True for k in typing.cast(list[str], base_definition.get("required", []))}
+        json_properties = dict(typing.cast(JsonDict, base_definition.get("properties", {})))
+        required_by_name = dict.fromkeys(typing.cast(list[str], base_definition.get("required", [])), True)
         json_custom_properties = typing.cast(JsonDict | None, base_definition.get("additionalProperties", None))
-        json_all_of = typing.cast(list[JsonDict], base_definition.get("allOf", []))
+        json_all_of = list(typing.cast(list[JsonDict], base_definition.get("allOf", [])))
 
         for property in itertools.chain(properties, overridden_properties):
             for name in property.names: